@@ -0,0 +1,244 @@
+"""Headless benchmark for the CID RMS bot.
+
+Drives the real command callbacks and modal handlers from bot.py with fake interactions against
+a synthetic SQLite database, then prints per-command latency percentiles and throughput as JSON:
+
+    python bench.py --sizes 1000 100000 1000000 --concurrency 16 --duration 30 --output bench.json
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import discord
+from discord import app_commands
+
+import bot
+
+WORDS = ("armed", "robbery", "battery", "vehicle", "pursuit", "narcotics", "warehouse", "docks", "witness", "firearm", "casing", "fentanyl", "meth", "gang", "tattoo", "shots", "fired", "victim", "injury", "stolen", "property", "burglary", "homicide", "surveillance", "informant", "raid", "evidence", "bodycam", "statement", "alibi")
+NAMES = ("John", "Jane", "Marcus", "Lena", "Tyrone", "Ashley", "Carlos", "Mei", "Ivan", "Priya", "Darnell", "Sofia")
+SURNAMES = ("Smith", "Doe", "Johnson", "Garcia", "Nguyen", "Williams", "Brown", "Silva", "Kowalski", "Patel", "Hughes", "Reyes")
+STATUSES = ("OPEN", "CLOSED", "COLD")
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+        self.sent = []
+    async def _record(self, kind, *args, **kwargs):
+        self.done = True
+        self.sent.append((kind, args, kwargs))
+    async def send_message(self, *args, **kwargs): await self._record("send_message", *args, **kwargs)
+    async def send_modal(self, *args, **kwargs): await self._record("send_modal", *args, **kwargs)
+    async def edit_message(self, *args, **kwargs): await self._record("edit_message", *args, **kwargs)
+    async def defer(self, *args, **kwargs): await self._record("defer", *args, **kwargs)
+    def is_done(self): return self.done
+
+class FakeRole:
+    def __init__(self, role_id): self.id = role_id
+
+class FakeUser:
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.display_name = name
+        self.roles = [FakeRole(bot.CID_ROLE_ID)]
+
+class FakeInteraction:
+    def __init__(self, client, user):
+        self.client = client
+        self.user = user
+        self.response = FakeResponse()
+        self.created_at = discord.utils.utcnow()
+    async def edit_original_response(self, **kwargs): self.response.sent.append(("edit_original_response", (), kwargs))
+
+def synthetic_narrative(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+
+def seed(path, size, rng):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cases (case_id TEXT PRIMARY KEY, detective TEXT, suspect TEXT, charges TEXT, narrative TEXT, status TEXT, timestamp TEXT)")
+    conn.execute("CREATE TABLE case_jackets (id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT, url TEXT, label TEXT, added_by TEXT)")
+    conn.execute("CREATE TABLE penal_code (code_id TEXT PRIMARY KEY, title TEXT, classification TEXT, description TEXT)")
+    conn.executemany("INSERT INTO penal_code VALUES (?, ?, ?, ?)", [(f"5-{n // 10 + 1}-{n % 10 + 100}", f"{rng.choice(WORDS).title()} in the {rng.choice(('First', 'Second', 'Third'))} Degree", rng.choice(("Class A Felony", "Class B Felony", "Class A Misdemeanor")), synthetic_narrative(rng)) for n in range(80)])
+    start = datetime.datetime(2020, 1, 1)
+    case_ids = []
+    for offset in range(0, size, 50000):
+        cases, jackets = [], []
+        for n in range(offset, min(size, offset + 50000)):
+            opened = start + datetime.timedelta(minutes=n * 3)
+            case_id = f"{opened:%y}-{'DTF' if n % 4 == 0 else 'CID'}-{n + 1:07d}"
+            case_ids.append(case_id)
+            cases.append((case_id, f"Det. {rng.choice(SURNAMES)}", f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}", f"{rng.choice(WORDS)} {rng.choice(WORDS)}", synthetic_narrative(rng), rng.choice(STATUSES), opened.isoformat()))
+            jackets.extend((case_id, f"https://docs.example/{case_id}/{j}", f"Report {j}", "bench") for j in range(rng.randint(0, 2)))
+        conn.executemany("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)", cases)
+        conn.executemany("INSERT INTO case_jackets (case_id, url, label, added_by) VALUES (?, ?, ?, ?)", jackets)
+        conn.commit()
+    conn.close()
+    return case_ids
+
+def age_statuses(path):
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE cases SET status_changed = timestamp")
+    conn.commit()
+    conn.close()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(samples, elapsed):
+    return {"count": len(samples), "ops_per_sec": round(len(samples) / elapsed, 2), "mean_ms": round(statistics.fmean(samples) * 1000, 3), "p50_ms": round(percentile(samples, 50) * 1000, 3), "p95_ms": round(percentile(samples, 95) * 1000, 3), "p99_ms": round(percentile(samples, 99) * 1000, 3), "max_ms": round(max(samples) * 1000, 3)}
+
+def reply_kind(result):
+    if isinstance(result, FakeInteraction):
+        if not result.response.sent: return "no reply"
+        kind, args, kwargs = result.response.sent[0]
+        if kind == "send_modal": return "modal"
+        content = args[0] if args else kwargs.get("content")
+        if content: return content.split()[0]
+        return "embed" if "embed" in kwargs else kind
+    if isinstance(result, list): return "choices" if result else "no choices"
+    return "moved" if result else "nothing to move"
+
+class Workload:
+    def __init__(self, client, case_ids, hot_ids, rng, archive_after_days):
+        self.client = client
+        self.case_ids = case_ids
+        self.hot_ids = hot_ids
+        self.rng = rng
+        self.archive_after_days = archive_after_days
+        self.user = FakeUser(next(iter(bot.ADMIN_IDS), 0), "Bench Detective")
+    def interaction(self): return FakeInteraction(self.client, self.user)
+    async def invoke(self, command, *args):
+        interaction = self.interaction()
+        await command.callback(interaction, *args)
+        return interaction
+    async def case_lookup(self): return await self.invoke(bot.case_lookup, self.rng.choice(self.case_ids))
+    async def case_directory(self, include_archived=False):
+        interaction = await self.invoke(bot.case_directory, include_archived)
+        view = interaction.response.sent[-1][2].get("view")
+        if view: await view.children[1].callback(self.interaction())
+        return interaction
+    async def case_directory_archived(self): return await self.case_directory(include_archived=True)
+    async def law_directory(self): return await self.invoke(bot.law_directory)
+    async def search_law(self): return await self.invoke(bot.search_law, self.rng.choice(WORDS)[:5])
+    async def search_cases(self, include_archived=False): return await self.invoke(bot.search_cases, f"{self.rng.choice(WORDS)} {self.rng.choice(WORDS)[:4]}", include_archived)
+    async def search_cases_archived(self): return await self.search_cases(include_archived=True)
+    async def archive_cases(self): return await bot.archive_cases(self.client.db, self.archive_after_days)
+    async def case_id_autocomplete(self): return await bot.case_id_autocomplete(self.interaction(), self.rng.choice(self.case_ids)[:self.rng.randint(1, 8)])
+    async def file_case(self):
+        interaction = self.interaction()
+        modal = bot.CaseModal(department=self.rng.choice(("CID", "DTF")))
+        for item, value in ((modal.suspect, f"{self.rng.choice(NAMES)} {self.rng.choice(SURNAMES)}"), (modal.charges, self.rng.choice(WORDS)), (modal.narrative, synthetic_narrative(self.rng))): item._refresh_state(interaction, {"value": value})
+        await modal.on_submit(interaction)
+        return interaction
+    async def add_evidence(self): return await self.invoke(bot.add_evidence, self.rng.choice(self.hot_ids), f"https://media.example/{self.rng.getrandbits(32):08x}.mp4")
+    async def add_jacket(self): return await self.invoke(bot.add_jacket, self.rng.choice(self.hot_ids), "https://docs.example/affidavit", "PC Affidavit")
+    async def edit_case(self): return await self.invoke(bot.edit_case, self.rng.choice(self.hot_ids), app_commands.Choice(name="Keep Current Status", value="KEEP"))
+
+MIX = {"case_lookup": 30, "case_directory": 8, "case_directory_archived": 2, "law_directory": 5, "search_law": 10, "search_cases": 8, "search_cases_archived": 2, "case_id_autocomplete": 15, "file_case": 8, "add_evidence": 6, "add_jacket": 3, "edit_case": 3, "archive_cases": 1}
+
+async def run_sequential(workload, iterations):
+    results = {}
+    for name in MIX:
+        op = getattr(workload, name)
+        samples, replies = [], collections.Counter()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t = time.perf_counter()
+            result = await op()
+            samples.append(time.perf_counter() - t)
+            replies[reply_kind(result)] += 1
+        results[name] = {**summarize(samples, time.perf_counter() - started), "replies": dict(replies)}
+    return results
+
+async def run_mixed(workload, concurrency, duration):
+    samples = {name: [] for name in MIX}
+    replies = {name: collections.Counter() for name in MIX}
+    names, weights = list(MIX), list(MIX.values())
+    deadline = time.perf_counter() + duration
+    errors = []
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = workload.rng.choices(names, weights)[0]
+            t = time.perf_counter()
+            try: result = await getattr(workload, name)()
+            except Exception as e:
+                errors.append(f"{name}: {e!r}")
+                continue
+            samples[name].append(time.perf_counter() - t)
+            replies[name][reply_kind(result)] += 1
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    total = sum(len(s) for s in samples.values())
+    return {"concurrency": concurrency, "elapsed_s": round(elapsed, 3), "throughput_ops_per_sec": round(total / elapsed, 2), "errors": len(errors), "error_samples": errors[:5], "commands": {name: {**summarize(s, elapsed), "replies": dict(replies[name])} for name, s in samples.items() if s}}
+
+async def bench_size(size, args):
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"bench_{size}.db")
+        archive_path = os.path.join(tmp, f"bench_{size}_archive.db")
+        started = time.perf_counter()
+        case_ids = seed(path, size, rng)
+        seeded = time.perf_counter()
+        client = bot.client
+        client.db = bot.Database(path, readers=args.readers, archive_path=archive_path)
+        await client.db.open()
+        await bot.init_db(client.db)
+        await client.db.close()
+        migrated = time.perf_counter()
+        age_statuses(path)
+        restarted = time.perf_counter()
+        client.db = bot.Database(path, readers=args.readers, archive_path=archive_path)
+        client.index = bot.RecordIndex()
+        await client.db.open()
+        await bot.init_db(client.db)
+        await client.index.load_laws(client.db)
+        ready = time.perf_counter()
+        await client.index.load_cases(client.db)
+        indexed = time.perf_counter()
+        try:
+            archived = await bot.archive_cases(client.db, args.archive_after_days)
+            result = {"size": size, "seed_s": round(seeded - started, 3), "migrate_s": round(migrated - seeded, 3), "startup_s": round(ready - restarted, 3), "case_index_s": round(indexed - ready, 3), "archived": archived, "archive_s": round(time.perf_counter() - indexed, 3)}
+            hot_ids = [row[0] for row in await client.db.fetchall("SELECT case_id FROM main.cases")]
+            workload = Workload(client, case_ids, hot_ids, rng, args.archive_after_days)
+            result["sequential"] = await run_sequential(workload, args.iterations)
+            result["mixed"] = await run_mixed(workload, args.concurrency, args.duration)
+        finally: await client.db.close()
+    return result
+
+def git_revision():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: return None
+
+async def main(args):
+    report = {"revision": git_revision(), "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "started_at": datetime.datetime.now().isoformat(), "config": vars(args), "results": []}
+    for size in args.sizes:
+        report["results"].append(await bench_size(size, args))
+        print(f"size={size:,} done", flush=True, file=sys.stderr)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp: fp.write(output)
+    else: print(output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CID RMS command handlers without a Discord connection")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000], help="number of seeded cases per run (e.g. 1000 100000 1000000)")
+    parser.add_argument("--iterations", type=int, default=200, help="sequential calls per command")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent workers in the mixed workload")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run the mixed workload")
+    parser.add_argument("--archive-after-days", type=int, default=bot.ARCHIVE_AFTER_DAYS, help="age after which CLOSED/COLD cases move to the archive tier before the workload runs")
+    parser.add_argument("--readers", type=int, default=4, help="reader connections in the database pool")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for data and workload")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    asyncio.run(main(parser.parse_args()))
@@ -1,88 +1,668 @@
 import discord
 from discord import app_commands, ui
-from discord.ext import commands
+from discord.ext import commands, tasks
+from aiohttp import web
+import aiohttp
 import aiosqlite
+import asyncio
+import bisect
+import collections
+import contextlib
+import contextvars
+import csv
 import datetime
-async def init_db():
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("CREATE TABLE IF NOT EXISTS cases (case_id TEXT PRIMARY KEY, detective TEXT, suspect TEXT, charges TEXT, narrative TEXT, status TEXT, timestamp TEXT)")
-        await db.execute("CREATE TABLE IF NOT EXISTS case_jackets (id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT, url TEXT, label TEXT, added_by TEXT)")
-        await db.execute("CREATE TABLE IF NOT EXISTS penal_code (code_id TEXT PRIMARY KEY, title TEXT, classification TEXT, description TEXT)")
-        await db.commit()
-
-async def get_next_case_id(dept_code: str):
-    now = datetime.datetime.now()
-    year_prefix = now.strftime("%y")
-    pattern = f"{year_prefix}-{dept_code}-%"
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT case_id FROM cases WHERE case_id LIKE ?", (pattern,))
-        rows = await cursor.fetchall()
-    if not rows: return f"{year_prefix}-{dept_code}-001"
-    max_num = 0
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import urllib.parse
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+SLOW_QUERY_MS = 100
+SLOW_COMMAND_MS = 1500
+INTERACTION_DEADLINE = 3.0
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_INTERVAL_HOURS = 6
+ARCHIVE_BATCH_SIZE = 500
+INDEX_LOAD_ATTEMPTS = 3
+INDEX_RETRY_SECONDS = 30
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0, 10.0)
+log = logging.getLogger("cid")
+command_stats = contextvars.ContextVar("command_stats", default=None)
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = collections.deque(maxlen=1024)
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+    def percentile(self, pct: float):
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] if ordered else 0.0
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.commands = collections.defaultdict(Histogram)
+        self.interaction_age = collections.defaultdict(Histogram)
+        self.queries = collections.defaultdict(Histogram)
+        self.counters = collections.Counter()
+    def observe_query(self, sql: str, elapsed: float, rows: int):
+        kind = sql.split(None, 1)[0].upper()
+        self.queries[kind].observe(elapsed)
+        self.observe_rows(rows)
+        stats = command_stats.get()
+        if stats is not None: stats["queries"] += 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            self.counters[("cid_slow_queries_total", kind)] += 1
+            log.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, stats["name"] if stats else "background", " ".join(sql.split())[:300])
+    def observe_rows(self, rows: int):
+        stats = command_stats.get()
+        if stats is not None: stats["rows"] += rows
+    def observe_command(self, name: str, elapsed: float, age, failed: bool, stats):
+        self.commands[name].observe(elapsed)
+        self.counters[("cid_command_queries_total", name)] += stats["queries"]
+        self.counters[("cid_command_rows_total", name)] += stats["rows"]
+        if failed: self.counters[("cid_command_errors_total", name)] += 1
+        if age is not None:
+            self.interaction_age[name].observe(age)
+            if age > INTERACTION_DEADLINE: self.counters[("cid_deadline_misses_total", name)] += 1
+        if elapsed * 1000 >= SLOW_COMMAND_MS: log.warning("Slow handler %s took %.1f ms (%d queries, %d rows)", name, elapsed * 1000, stats["queries"], stats["rows"])
+    def render(self):
+        def label(value): return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        lines = [f"cid_uptime_seconds {time.time() - self.started:.3f}"]
+        for metric, help_text, label_name, histograms in (("cid_command_duration_seconds", "Handler wall time.", "command", self.commands), ("cid_interaction_age_seconds", "Time from interaction creation to the initial response (acknowledgement).", "command", self.interaction_age), ("cid_sql_duration_seconds", "SQL statement execution time.", "statement", self.queries)):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+            for key, hist in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), hist.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label_name}="{label(key)}",le="{bound}"}} {cumulative}')
+                lines += [f'{metric}_sum{{{label_name}="{label(key)}"}} {hist.sum:.6f}', f'{metric}_count{{{label_name}="{label(key)}"}} {hist.count}']
+        for metric in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {metric} counter")
+            label_name = "statement" if metric == "cid_slow_queries_total" else "command"
+            lines += [f'{metric}{{{label_name}="{label(key)}"}} {value}' for (name, key), value in sorted(self.counters.items()) if name == metric]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def instrumented(func):
+    method = "." in func.__qualname__
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        name = f"{type(args[0]).__name__}.{func.__name__}" if method else func.__name__
+        interaction = args[1] if method else args[0]
+        stats = {"name": name, "queries": 0, "rows": 0}
+        token = command_stats.set(stats)
+        started, failed = time.perf_counter(), False
+        try: return await func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            command_stats.reset(token)
+            created_at = getattr(interaction, "created_at", None)
+            metrics.observe_command(name, time.perf_counter() - started, ((stats.get("acked_at") or discord.utils.utcnow()) - created_at).total_seconds() if created_at else None, failed, stats)
+    return wrapper
+
+def acknowledges(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        result = await func(*args, **kwargs)
+        stats = command_stats.get()
+        if stats is not None: stats.setdefault("acked_at", discord.utils.utcnow())
+        return result
+    return wrapper
+
+for response_method in ("send_message", "defer", "send_modal", "edit_message", "autocomplete"): setattr(discord.InteractionResponse, response_method, acknowledges(getattr(discord.InteractionResponse, response_method)))
+
+class TimedCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+    @property
+    def rowcount(self): return self.cursor.rowcount
+    async def fetchone(self):
+        row = await self.cursor.fetchone()
+        metrics.observe_rows(row is not None)
+        return row
+    async def fetchall(self):
+        rows = await self.cursor.fetchall()
+        metrics.observe_rows(len(rows))
+        return rows
+    async def close(self): await self.cursor.close()
+
+class TimedStatement:
+    def __init__(self, sql, pending):
+        self.sql = sql
+        self.pending = pending
+        self.cursor = None
+    async def run(self):
+        started = time.perf_counter()
+        cursor = await self.pending
+        metrics.observe_query(self.sql, time.perf_counter() - started, max(cursor.rowcount, 0))
+        return TimedCursor(cursor)
+    def __await__(self): return self.run().__await__()
+    async def __aenter__(self):
+        self.cursor = await self.run()
+        return self.cursor
+    async def __aexit__(self, *exc): await self.cursor.close()
+
+class TimedConnection:
+    def __init__(self, conn):
+        self.conn = conn
+    def execute(self, sql, params=()): return TimedStatement(sql, self.conn.execute(sql, params))
+    def executemany(self, sql, params): return TimedStatement(sql, self.conn.executemany(sql, params))
+
+DB_PRAGMAS = ("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL", "PRAGMA busy_timeout = 5000", "PRAGMA temp_store = MEMORY", "PRAGMA cache_size = -16000", "PRAGMA mmap_size = 268435456")
+
+class Database:
+    def __init__(self, path, readers=4, cached_statements=256, archive_path=None):
+        self.path = path
+        self.archive_path = archive_path
+        self.reader_count = readers
+        self.cached_statements = cached_statements
+        self.writer = None
+        self.readers = None
+        self.reader_conns = []
+        self.write_lock = None
+    async def connect(self):
+        conn = await aiosqlite.connect(self.path, isolation_level=None, cached_statements=self.cached_statements)
+        for pragma in DB_PRAGMAS: await conn.execute(pragma)
+        if self.archive_path: await conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        return conn
+    async def open(self):
+        self.readers = asyncio.Queue()
+        self.write_lock = asyncio.Lock()
+        self.writer = await self.connect()
+        if self.archive_path:
+            async with self.writer.execute("PRAGMA archive.journal_mode = WAL") as cursor: await cursor.fetchone()
+        self.reader_conns = [await self.connect() for _ in range(self.reader_count)]
+        for conn in self.reader_conns: self.readers.put_nowait(conn)
+    async def close(self):
+        if self.writer is None: return
+        async with self.write_lock:
+            for conn in self.reader_conns: await conn.close()
+            self.reader_conns = []
+            await self.writer.execute("PRAGMA optimize")
+            await self.writer.close()
+            self.writer = None
+    @contextlib.asynccontextmanager
+    async def read(self):
+        conn = await self.readers.get()
+        try: yield TimedConnection(conn)
+        finally: self.readers.put_nowait(conn)
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        async with self.write_lock:
+            async with self.begin() as conn: yield conn
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        await self.writer.execute("BEGIN IMMEDIATE")
+        try: yield TimedConnection(self.writer)
+        except BaseException:
+            await self.writer.execute("ROLLBACK")
+            raise
+        await self.writer.execute("COMMIT")
+    async def fetchone(self, sql, params=()):
+        async with self.read() as conn:
+            async with conn.execute(sql, params) as cursor: return await cursor.fetchone()
+    async def fetchall(self, sql, params=()):
+        async with self.read() as conn:
+            async with conn.execute(sql, params) as cursor: return await cursor.fetchall()
+    async def execute(self, sql, params=()):
+        async with self.transaction() as conn:
+            async with conn.execute(sql, params) as cursor: return cursor.rowcount
+
+COUNTED_TABLES = ("cases", "penal_code")
+SEQUENCE_BUMP_SQL = "INSERT INTO case_sequences VALUES (?, ?, ?) ON CONFLICT(year, dept) DO UPDATE SET last_value = MAX(last_value, excluded.last_value)"
+IMPORT_BATCH_SIZE = 500
+IMPORT_STATUSES = ("OPEN", "CLOSED", "COLD")
+LEGACY_EVIDENCE = re.compile(r"\n\n\*\*\[EVIDENCE\]\*\* (.*): (.*)")
+FTS_UNSAFE = re.compile(r'["\x00-\x1f\x7f]')
+FTS_TABLES = {"cases_fts": ("cases", ("case_id", "suspect", "charges", "narrative")), "penal_code_fts": ("penal_code", ("code_id", "title", "description"))}
+
+async def migrate_base_tables(conn):
+    await conn.execute("CREATE TABLE IF NOT EXISTS cases (case_id TEXT PRIMARY KEY, detective TEXT, suspect TEXT, charges TEXT, narrative TEXT, status TEXT, timestamp TEXT)")
+    await conn.execute("CREATE TABLE IF NOT EXISTS case_jackets (id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT, url TEXT, label TEXT, added_by TEXT)")
+    await conn.execute("CREATE TABLE IF NOT EXISTS penal_code (code_id TEXT PRIMARY KEY, title TEXT, classification TEXT, description TEXT)")
+
+async def migrate_case_sequences(conn):
+    await conn.execute("CREATE TABLE IF NOT EXISTS case_sequences (year TEXT, dept TEXT, last_value INTEGER NOT NULL, PRIMARY KEY (year, dept)) WITHOUT ROWID")
+    await seed_case_sequences(conn)
+
+async def migrate_row_counts(conn):
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_timestamp ON cases (timestamp, case_id)")
+    await create_row_counts(conn, "main", COUNTED_TABLES)
+
+async def create_row_counts(conn, schema, tables):
+    await conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.row_counts (tbl TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID")
+    for table in tables:
+        await conn.execute(f"INSERT OR REPLACE INTO {schema}.row_counts SELECT '{table}', COUNT(*) FROM {schema}.{table}")
+        await conn.execute(f"CREATE TRIGGER IF NOT EXISTS {schema}.{table}_count_ai AFTER INSERT ON {table} BEGIN UPDATE row_counts SET n = n + 1 WHERE tbl = '{table}'; END")
+        await conn.execute(f"CREATE TRIGGER IF NOT EXISTS {schema}.{table}_count_ad AFTER DELETE ON {table} BEGIN UPDATE row_counts SET n = n - 1 WHERE tbl = '{table}'; END")
+
+async def migrate_full_text_search(conn):
+    await create_search_tables(conn, "main", FTS_TABLES)
+
+async def create_search_tables(conn, schema, fts_tables):
+    for fts, (table, columns) in fts_tables.items():
+        cols, new_cols, old_cols = ", ".join(columns), ", ".join(f"new.{c}" for c in columns), ", ".join(f"old.{c}" for c in columns)
+        await conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.{fts} USING fts5({cols}, content='{table}', content_rowid='rowid')")
+        await conn.execute(f"CREATE TRIGGER IF NOT EXISTS {schema}.{fts}_ai AFTER INSERT ON {table} BEGIN INSERT INTO {fts} (rowid, {cols}) VALUES (new.rowid, {new_cols}); END")
+        await conn.execute(f"CREATE TRIGGER IF NOT EXISTS {schema}.{fts}_ad AFTER DELETE ON {table} BEGIN INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols}); END")
+        await conn.execute(f"CREATE TRIGGER IF NOT EXISTS {schema}.{fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols}); INSERT INTO {fts} (rowid, {cols}) VALUES (new.rowid, {new_cols}); END")
+        await conn.execute(f"INSERT INTO {schema}.{fts} ({fts}) VALUES ('rebuild')")
+
+async def migrate_case_evidence(conn):
+    await conn.execute("CREATE TABLE IF NOT EXISTS case_evidence (id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT NOT NULL, url TEXT, added_by TEXT, timestamp TEXT)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_case_evidence_case ON case_evidence (case_id, id)")
+    await migrate_legacy_evidence(conn)
+
+async def migrate_lookup_indexes(conn):
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_case_jackets_case ON case_jackets (case_id)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status)")
+    await conn.execute("CREATE TABLE IF NOT EXISTS bot_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+
+async def migrate_status_changed(conn):
+    async with conn.execute("SELECT 1 FROM pragma_table_info('cases') WHERE name = 'status_changed'") as cursor: exists = await cursor.fetchone()
+    if not exists: await conn.execute("ALTER TABLE cases ADD COLUMN status_changed TEXT")
+    await conn.execute("UPDATE cases SET status_changed = ? WHERE status_changed IS NULL", (datetime.datetime.now().isoformat(),))
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_archivable ON cases (status_changed) WHERE status IN ('CLOSED', 'COLD')")
+
+MIGRATIONS = (migrate_base_tables, migrate_case_sequences, migrate_row_counts, migrate_full_text_search, migrate_case_evidence, migrate_lookup_indexes, migrate_status_changed)
+
+async def migrate_archive_tables(conn):
+    await conn.execute("CREATE TABLE IF NOT EXISTS archive.cases (case_id TEXT PRIMARY KEY, detective TEXT, suspect TEXT, charges TEXT, narrative TEXT, status TEXT, timestamp TEXT, status_changed TEXT, archived_at TEXT)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_cases_timestamp ON cases (timestamp, case_id)")
+    await conn.execute("CREATE TABLE IF NOT EXISTS archive.case_jackets (id INTEGER PRIMARY KEY, case_id TEXT, url TEXT, label TEXT, added_by TEXT)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_case_jackets_case ON case_jackets (case_id)")
+    await conn.execute("CREATE TABLE IF NOT EXISTS archive.case_evidence (id INTEGER PRIMARY KEY, case_id TEXT NOT NULL, url TEXT, added_by TEXT, timestamp TEXT)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_case_evidence_case ON case_evidence (case_id, id)")
+    await create_row_counts(conn, "archive", ("cases",))
+    await create_search_tables(conn, "archive", {"cases_fts": FTS_TABLES["cases_fts"]})
+
+ARCHIVE_MIGRATIONS = (migrate_archive_tables,)
+
+async def apply_migrations(db: Database, schema: str, migrations):
+    version = (await db.fetchone(f"PRAGMA {schema}.user_version"))[0]
+    for number, migration in enumerate(migrations[version:], version + 1):
+        async with db.transaction() as conn:
+            await migration(conn)
+            await conn.execute(f"PRAGMA {schema}.user_version = {number}")
+        log.info("Applied %s schema migration %d (%s)", schema, number, migration.__name__)
+
+async def init_db(db: Database):
+    await apply_migrations(db, "main", MIGRATIONS)
+    if db.archive_path: await apply_migrations(db, "archive", ARCHIVE_MIGRATIONS)
+
+async def migrate_legacy_evidence(conn):
+    async with conn.execute("SELECT case_id, narrative FROM cases WHERE narrative LIKE '%**[EVIDENCE]**%'") as cursor: rows = await cursor.fetchall()
+    for case_id, narrative in rows:
+        await conn.executemany("INSERT INTO case_evidence (case_id, url, added_by) VALUES (?, ?, ?)", [(case_id, url, added_by) for added_by, url in LEGACY_EVIDENCE.findall(narrative)])
+        await conn.execute("UPDATE cases SET narrative = ? WHERE case_id = ?", (LEGACY_EVIDENCE.sub("", narrative), case_id))
+
+DOSSIER_SQL = """SELECT 'case', suspect, status, narrative, NULL FROM {schema}.cases WHERE case_id = ?1
+UNION ALL SELECT 'jacket', label, url, NULL, NULL FROM {schema}.case_jackets WHERE case_id = ?1
+UNION ALL SELECT 'count', COUNT(*), NULL, NULL, NULL FROM {schema}.case_evidence WHERE case_id = ?1
+UNION ALL SELECT * FROM (SELECT 'evidence', id, url, added_by, timestamp FROM {schema}.case_evidence WHERE case_id = ?1 """
+
+async def load_dossier(db: Database, case_id: str, after=None, before=None, limit=5):
+    for schema in ("main", "archive") if db.archive_path else ("main",):
+        if before is not None: rows = await db.fetchall(DOSSIER_SQL.format(schema=schema) + "AND id < ?3 ORDER BY id DESC LIMIT ?2)", (case_id, limit, before))
+        else: rows = await db.fetchall(DOSSIER_SQL.format(schema=schema) + "AND id > ?3 ORDER BY id ASC LIMIT ?2)", (case_id, limit, after or 0))
+        case = next((row[1:] for row in rows if row[0] == "case"), None)
+        if case is not None: break
+    if case is None: return None
+    jackets = [row[1:3] for row in rows if row[0] == "jacket"]
+    total = next(row[1] for row in rows if row[0] == "count")
+    evidence = [row[1:] for row in rows if row[0] == "evidence"]
+    return case, jackets, evidence[::-1] if before is not None else evidence, total, schema == "archive"
+
+ARCHIVE_BATCH_SQL = "INSERT INTO temp.archive_batch SELECT case_id FROM main.cases WHERE status IN ('CLOSED', 'COLD') AND status_changed < ? ORDER BY status_changed LIMIT ?"
+CASE_FIELDS = "case_id, detective, suspect, charges, narrative, status, timestamp"
+CASE_COLUMNS = f"{CASE_FIELDS}, status_changed"
+CASE_INSERT_SQL = f"INSERT INTO main.cases ({CASE_COLUMNS}) VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?7)"
+JACKET_INSERT_SQL = "INSERT INTO main.case_jackets (case_id, url, label, added_by) SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM main.cases WHERE case_id = ?1)"
+EVIDENCE_INSERT_SQL = "INSERT INTO main.case_evidence (case_id, url, added_by, timestamp) SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM main.cases WHERE case_id = ?1)"
+
+async def archive_cases(db: Database, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=older_than_days)).isoformat()
+    moved = 0
+    while True:
+        async with db.write_lock:
+            async with db.begin() as conn:
+                await conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (case_id TEXT PRIMARY KEY)")
+                await conn.execute("DELETE FROM temp.archive_batch")
+                async with conn.execute(ARCHIVE_BATCH_SQL, (cutoff, batch_size)) as cursor: batch = cursor.rowcount
+                if batch:
+                    await conn.execute(f"INSERT OR IGNORE INTO archive.cases ({CASE_COLUMNS}, archived_at) SELECT {CASE_COLUMNS}, ? FROM main.cases WHERE case_id IN temp.archive_batch", (datetime.datetime.now().isoformat(),))
+                    await conn.execute("INSERT OR IGNORE INTO archive.case_jackets SELECT id, case_id, url, label, added_by FROM main.case_jackets WHERE case_id IN temp.archive_batch")
+                    await conn.execute("INSERT OR IGNORE INTO archive.case_evidence SELECT id, case_id, url, added_by, timestamp FROM main.case_evidence WHERE case_id IN temp.archive_batch")
+            if not batch: return moved
+            async with db.begin() as conn:
+                await conn.execute("DELETE FROM temp.archive_batch WHERE case_id NOT IN (SELECT case_id FROM archive.cases)")
+                await conn.execute("DELETE FROM main.case_jackets WHERE case_id IN temp.archive_batch")
+                await conn.execute("DELETE FROM main.case_evidence WHERE case_id IN temp.archive_batch")
+                async with conn.execute("DELETE FROM main.cases WHERE case_id IN temp.archive_batch") as cursor: moved += cursor.rowcount
+
+async def is_archived(db: Database, case_id: str):
+    return bool(db.archive_path and await db.fetchone("SELECT 1 FROM archive.cases WHERE case_id = ?", (case_id,)))
+
+async def restore_case(db: Database, case_id: str):
+    if not await is_archived(db, case_id): return False
+    async with db.write_lock:
+        async with db.begin() as conn:
+            await conn.execute(f"INSERT OR IGNORE INTO main.cases ({CASE_COLUMNS}) SELECT {CASE_FIELDS}, ?2 FROM archive.cases WHERE case_id = ?1", (case_id, datetime.datetime.now().isoformat()))
+            await conn.execute("INSERT OR IGNORE INTO main.case_jackets SELECT id, case_id, url, label, added_by FROM archive.case_jackets WHERE case_id = ?", (case_id,))
+            await conn.execute("INSERT OR IGNORE INTO main.case_evidence SELECT id, case_id, url, added_by, timestamp FROM archive.case_evidence WHERE case_id = ?", (case_id,))
+        async with db.begin() as conn:
+            for table in ("case_jackets", "case_evidence", "cases"): await conn.execute(f"DELETE FROM archive.{table} WHERE case_id = ?1 AND EXISTS (SELECT 1 FROM main.cases WHERE case_id = ?1)", (case_id,))
+    log.info("Restored case %s from the archive", case_id)
+    return True
+
+def fts_query(text: str):
+    return " ".join(f'"{term}"*' for term in FTS_UNSAFE.sub(" ", text).split())
+
+async def search_penal_code(db: Database, query: str, limit=10):
+    match = fts_query(query)
+    if not match: return 0, []
+    total = await db.fetchone("SELECT COUNT(*) FROM penal_code_fts WHERE penal_code_fts MATCH ?", (match,))
+    rows = await db.fetchall("SELECT p.code_id, p.title, p.classification, p.description, snippet(penal_code_fts, 2, '**', '**', '…', 16) FROM penal_code_fts JOIN penal_code p ON p.rowid = penal_code_fts.rowid WHERE penal_code_fts MATCH ? ORDER BY bm25(penal_code_fts, 10.0, 5.0, 1.0) LIMIT ?", (match, limit))
+    return total[0], rows
+
+CASE_SEARCH_SQL = "SELECT * FROM (SELECT c.case_id, c.suspect, c.status, snippet(cases_fts, -1, '**', '**', '…', 16), {archived}, bm25(cases_fts, 10.0, 5.0, 3.0, 1.0) AS score FROM {schema}.cases_fts JOIN {schema}.cases c ON c.rowid = cases_fts.rowid WHERE cases_fts MATCH ?1 ORDER BY score LIMIT ?2)"
+
+async def search_case_files(db: Database, query: str, limit=10, include_archived=False):
+    match = fts_query(query)
+    if not match: return 0, []
+    schemas = ("main", "archive") if include_archived and db.archive_path else ("main",)
+    total = await db.fetchone("SELECT " + " + ".join(f"(SELECT COUNT(*) FROM {schema}.cases_fts WHERE cases_fts MATCH ?1)" for schema in schemas), (match,))
+    rows = await db.fetchall(" UNION ALL ".join(CASE_SEARCH_SQL.format(schema=schema, archived=int(schema == "archive")) for schema in schemas) + " ORDER BY score LIMIT ?2", (match, limit))
+    return total[0], [row[:5] for row in rows]
+
+async def count_rows(db: Database, table: str, schema="main"):
+    row = await db.fetchone(f"SELECT n FROM {schema}.row_counts WHERE tbl = ?", (table,))
+    return row[0] if row else 0
+
+def parse_case_id(case_id: str):
+    try:
+        year, dept, num = case_id.split('-')
+        return year, dept, int(num)
+    except (AttributeError, ValueError): return None
+
+async def seed_case_sequences(conn):
+    async with conn.execute("SELECT case_id FROM cases") as cursor: rows = await cursor.fetchall()
+    latest = {}
     for row in rows:
-        try:
-            num = int(row[0].split('-')[2])
-            if num > max_num: max_num = num
-        except (IndexError, ValueError): continue
-    return f"{year_prefix}-{dept_code}-{max_num + 1:03d}"
-
-class LawPaginator(ui.View):
-    def __init__(self, laws, chunk_size=5):
-        super().__init__(timeout=60)
-        self.laws = laws
+        parsed = parse_case_id(row[0])
+        if parsed: latest[parsed[:2]] = max(latest.get(parsed[:2], 0), parsed[2])
+    await conn.executemany(SEQUENCE_BUMP_SQL, [(year, dept, num) for (year, dept), num in latest.items()])
+
+async def get_next_case_id(conn, dept_code: str):
+    year_prefix = datetime.datetime.now().strftime("%y")
+    await conn.execute("INSERT INTO case_sequences VALUES (?, ?, 1) ON CONFLICT(year, dept) DO UPDATE SET last_value = last_value + 1", (year_prefix, dept_code))
+    async with conn.execute("SELECT last_value FROM case_sequences WHERE year = ? AND dept = ?", (year_prefix, dept_code)) as cursor: row = await cursor.fetchone()
+    return f"{year_prefix}-{dept_code}-{row[0]:03d}"
+
+async def bump_case_sequence(conn, case_id: str):
+    parsed = parse_case_id(case_id)
+    if parsed: await conn.execute(SEQUENCE_BUMP_SQL, parsed)
+
+def read_import_records(fp, filename: str):
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    if filename.lower().endswith((".jsonl", ".ndjson")):
+        for line_no, line in enumerate(text, 1):
+            if not line.strip(): continue
+            try: yield line_no, json.loads(line)
+            except ValueError: yield line_no, line.rstrip("\r\n")
+        return
+    reader = csv.DictReader(text)
+    for record in reader: yield reader.line_num, record
+
+def validate_import_record(record, detective: str):
+    if not isinstance(record, dict): raise ValueError("malformed record")
+    def field(name, default=""): return str(record.get(name) or default).strip()
+    case_id, suspect, status = field("case_id"), field("suspect"), field("status", "OPEN").upper()
+    if not case_id or len(case_id) > 32: raise ValueError("missing or invalid case_id")
+    if not suspect: raise ValueError("missing suspect")
+    if status not in IMPORT_STATUSES: raise ValueError(f"invalid status {status!r}")
+    timestamp = field("timestamp")
+    try: timestamp = datetime.datetime.fromisoformat(timestamp).isoformat() if timestamp else datetime.datetime.now().isoformat()
+    except ValueError: raise ValueError(f"invalid timestamp {timestamp!r}")
+    jackets = record.get("jackets") or []
+    if isinstance(jackets, str): jackets = [dict(zip(("label", "url"), entry.split("|", 1))) for entry in jackets.split(";") if entry.strip()]
+    if not isinstance(jackets, list) or not all(isinstance(j, dict) and j.get("url") for j in jackets): raise ValueError("invalid jackets")
+    row = (case_id, field("detective", detective), suspect, field("charges", "LEGACY"), field("narrative", "Imported record."), status, timestamp)
+    return row, [(case_id, str(j["url"]).strip(), str(j.get("label") or "Jacket").strip(), row[1]) for j in jackets]
+
+async def import_batch(db: Database, batch, rejected):
+    accepted = []
+    async with db.transaction() as conn:
+        ids = [row[0] for _, row, _ in batch]
+        placeholders = ', '.join('?' * len(ids))
+        sql = f"SELECT case_id FROM main.cases WHERE case_id IN ({placeholders})" + (f" UNION ALL SELECT case_id FROM archive.cases WHERE case_id IN ({placeholders})" if db.archive_path else "")
+        async with conn.execute(sql, ids * 2 if db.archive_path else ids) as cursor: existing = {r[0] for r in await cursor.fetchall()}
+        for line_no, row, jackets in batch:
+            if row[0] in existing:
+                rejected.writerow((line_no, f"duplicate case_id {row[0]}", json.dumps(row)))
+                continue
+            existing.add(row[0])
+            accepted.append((row, jackets))
+        await conn.executemany(CASE_INSERT_SQL, [row for row, _ in accepted])
+        await conn.executemany("INSERT INTO case_jackets (case_id, url, label, added_by) VALUES (?, ?, ?, ?)", [jacket for _, jackets in accepted for jacket in jackets])
+        await conn.executemany(SEQUENCE_BUMP_SQL, [parsed for parsed in (parse_case_id(row[0]) for row, _ in accepted) if parsed])
+    return [row for row, _ in accepted]
+
+class PrefixIndex:
+    def __init__(self):
+        self.entries = []
+    def add(self, key: str, value):
+        entry = (key.casefold(), value)
+        i = bisect.bisect_left(self.entries, entry)
+        if i == len(self.entries) or self.entries[i] != entry: self.entries.insert(i, entry)
+    def extend(self, pairs):
+        merged, start = [], 0
+        for entry in sorted({(key.casefold(), value) for key, value in pairs}):
+            i = bisect.bisect_left(self.entries, entry, start)
+            merged += self.entries[start:i]
+            if i == len(self.entries) or self.entries[i] != entry: merged.append(entry)
+            start = i
+        self.entries = merged + self.entries[start:]
+    def remove(self, key: str, value):
+        entry = (key.casefold(), value)
+        i = bisect.bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry: del self.entries[i]
+    def complete(self, prefix: str, limit=25):
+        prefix = prefix.casefold()
+        found = {}
+        for i in range(bisect.bisect_left(self.entries, (prefix,)), len(self.entries)):
+            key, value = self.entries[i]
+            if not key.startswith(prefix) or len(found) >= limit: break
+            found[value] = None
+        return list(found)
+
+class RecordIndex:
+    def __init__(self):
+        self.laws = {}
+        self.law_ids = []
+        self.law_keys = PrefixIndex()
+        self.open_cases = {}
+        self.case_keys = PrefixIndex()
+        self.cases_ready = False
+        self.pending_cases = []
+    async def load(self, db: Database):
+        await self.load_laws(db)
+        await self.load_cases(db)
+    async def load_laws(self, db: Database):
+        for law in await db.fetchall("SELECT code_id, title, classification, description FROM penal_code"): self.laws[law[0]] = law
+        self.law_ids = sorted(self.laws)
+        self.law_keys.extend((key, law[0]) for law in self.laws.values() for key in (law[0], law[1], *law[1].split()))
+    async def load_cases(self, db: Database):
+        open_cases = dict(await db.fetchall("SELECT case_id, COALESCE(suspect, '') FROM cases WHERE status = 'OPEN'"))
+        entries = await asyncio.get_running_loop().run_in_executor(None, lambda: sorted({(key.casefold(), case_id) for case_id, suspect in open_cases.items() for key in (case_id, suspect, *suspect.split())}))
+        self.open_cases, self.case_keys.entries = open_cases, entries
+        self.mark_cases_ready()
+    def mark_cases_ready(self):
+        self.cases_ready = True
+        for op, args in self.pending_cases: op(*args)
+        self.pending_cases = []
+    def add_law(self, law):
+        if law[0] not in self.laws: bisect.insort(self.law_ids, law[0])
+        self.laws[law[0]] = tuple(law)
+        for key in (law[0], law[1], *law[1].split()): self.law_keys.add(key, law[0])
+    def add_case(self, case_id: str, suspect: str):
+        if not self.cases_ready: return self.pending_cases.append((self.add_case, (case_id, suspect)))
+        self.remove_case(case_id)
+        suspect = suspect or ""
+        self.open_cases[case_id] = suspect
+        for key in (case_id, suspect, *suspect.split()): self.case_keys.add(key, case_id)
+    def add_cases(self, cases):
+        if not self.cases_ready: return self.pending_cases.append((self.add_cases, (cases,)))
+        for case_id, _ in cases:
+            if case_id in self.open_cases: self.remove_case(case_id)
+        cases = [(case_id, suspect or "") for case_id, suspect in cases]
+        self.open_cases.update(cases)
+        self.case_keys.extend((key, case_id) for case_id, suspect in cases for key in (case_id, suspect, *suspect.split()))
+    def rename_case(self, case_id: str, suspect: str):
+        if not self.cases_ready: return self.pending_cases.append((self.rename_case, (case_id, suspect)))
+        if case_id in self.open_cases: self.add_case(case_id, suspect)
+    def remove_case(self, case_id: str):
+        if not self.cases_ready: return self.pending_cases.append((self.remove_case, (case_id,)))
+        suspect = self.open_cases.pop(case_id, None)
+        if suspect is None: return
+        for key in (case_id, suspect, *suspect.split()): self.case_keys.remove(key, case_id)
+    def law_page(self, after=None, before=None, limit=5):
+        if before is not None:
+            end = bisect.bisect_left(self.law_ids, before)
+            return [self.laws[code] for code in self.law_ids[max(0, end - limit):end]]
+        start = bisect.bisect_right(self.law_ids, after) if after is not None else 0
+        return [self.laws[code] for code in self.law_ids[start:start + limit]]
+    def complete_laws(self, prefix: str, limit=25): return [self.laws[code] for code in self.law_keys.complete(prefix, limit)]
+    def complete_cases(self, prefix: str, limit=25): return [(case_id, self.open_cases[case_id]) for case_id in self.case_keys.complete(prefix, limit)]
+
+class KeysetPaginator:
+    kind = None
+    def __init__(self, client, filter="", chunk_size=5):
+        self.client = client
+        self.filter = filter
         self.chunk_size = chunk_size
         self.current_page = 0
-        self.max_pages = (len(laws) - 1) // chunk_size + 1
+        self.max_pages = 1
+        self.total = 0
+        self.rows = []
+    async def fetch(self, after=None, before=None): raise NotImplementedError
+    async def count(self): raise NotImplementedError
+    def key(self, row): raise NotImplementedError
+    def encode_key(self, key): return str(key)
+    def decode_key(self, cursor: str): return cursor
+    async def load(self, cursor=None, direction=None, page=0):
+        key = self.decode_key(cursor) if cursor is not None else None
+        self.rows = await self.fetch(after=key if direction == "n" else None, before=key if direction == "p" else None)
+        self.current_page = page + 1 if direction == "n" else page - 1 if direction == "p" else 0
+        if direction == "p" and (self.current_page <= 0 or len(self.rows) < self.chunk_size): self.rows, self.current_page = await self.fetch(), 0
+        self.total = await self.count()
+        self.max_pages = max(1, (self.total - 1) // self.chunk_size + 1)
+        return bool(self.rows)
+    def view(self):
+        view = ui.View(timeout=None)
+        view.add_item(PageButton(self.kind, self.filter, "p", self.current_page, self.encode_key(self.key(self.rows[0])), disabled=self.current_page == 0))
+        view.add_item(PageButton(self.kind, self.filter, "n", self.current_page, self.encode_key(self.key(self.rows[-1])), disabled=self.current_page + 1 >= self.max_pages))
+        return view
+
+class PageButton(ui.DynamicItem[ui.Button], template=r"cid:page:(?P<kind>[a-z]+):(?P<filter>[^:]*):(?P<direction>[pn]):(?P<page>\d+):(?P<cursor>.*)"):
+    def __init__(self, kind: str, filter: str, direction: str, page: int, cursor: str, disabled=False):
+        custom_id = f"cid:page:{kind}:{urllib.parse.quote(filter, safe='')}:{direction}:{page}:{cursor}"
+        super().__init__(ui.Button(label="Previous" if direction == "p" else "Next", style=discord.ButtonStyle.grey, custom_id=custom_id[:100], disabled=disabled or len(custom_id) > 100))
+        self.kind = kind
+        self.filter = filter
+        self.direction = direction
+        self.page = page
+        self.cursor = cursor
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match: re.Match):
+        return cls(match["kind"], urllib.parse.unquote(match["filter"]), match["direction"], int(match["page"]), match["cursor"])
+    @instrumented
+    async def callback(self, interaction: discord.Interaction):
+        paginator_cls = PAGINATORS.get(self.kind)
+        paginator = paginator_cls(interaction.client, self.filter) if paginator_cls else None
+        if paginator and await paginator.load(self.cursor, self.direction, self.page): await interaction.response.edit_message(embed=paginator.create_embed(), view=paginator.view())
+        else: await interaction.response.send_message("First page reached." if self.direction == "p" else "Last page reached.", ephemeral=True)
+
+class LawPaginator(KeysetPaginator):
+    kind = "law"
+    async def fetch(self, after=None, before=None): return self.client.index.law_page(after, before, self.chunk_size)
+    async def count(self): return len(self.client.index.law_ids)
+    def key(self, row): return row[0]
     def create_embed(self):
-        start = self.current_page * self.chunk_size
-        end = start + self.chunk_size
-        chunk = self.laws[start:end]
         embed = discord.Embed(title="⚖️ Arkansas Penal Code Directory", color=discord.Color.gold())
         embed.set_footer(text=f"Page {self.current_page + 1} of {self.max_pages} | Use /search_law for specific codes")
-        for law in chunk:
+        for law in self.rows:
             embed.add_field(name=f"{law[0]} - {law[1]}", value=f"**Class:** {law[2]}\n*{law[3]}*", inline=False)
         return embed
-    @ui.button(label="Previous", style=discord.ButtonStyle.grey)
-    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
-        if self.current_page > 0:
-            self.current_page -= 1
-            await interaction.response.edit_message(embed=self.create_embed(), view=self)
-        else: await interaction.response.send_message("First page reached.", ephemeral=True)
-    @ui.button(label="Next", style=discord.ButtonStyle.grey)
-    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
-        if (self.current_page + 1) < self.max_pages:
-            self.current_page += 1
-            await interaction.response.edit_message(embed=self.create_embed(), view=self)
-        else: await interaction.response.send_message("Last page reached.", ephemeral=True)
-
-class CasePaginator(ui.View):
-    def __init__(self, cases, chunk_size=5):
-        super().__init__(timeout=60)
-        self.cases = cases
-        self.chunk_size = chunk_size
-        self.current_page = 0
-        self.max_pages = (len(cases) - 1) // chunk_size + 1
+
+class CasePaginator(KeysetPaginator):
+    kind = "case"
+    def schemas(self): return ("main", "archive") if self.filter == "archived" and self.client.db.archive_path else ("main",)
+    async def fetch(self, after=None, before=None):
+        where, order = ("WHERE (timestamp, case_id) > (?1, ?2)", "ASC") if before is not None else ("WHERE (timestamp, case_id) < (?1, ?2)", "DESC") if after is not None else ("", "DESC")
+        sql = " UNION ALL ".join(f"SELECT * FROM (SELECT case_id, suspect, status, timestamp, {int(schema == 'archive')} FROM {schema}.cases {where} ORDER BY timestamp {order}, case_id {order} LIMIT ?3)" for schema in self.schemas())
+        rows = await self.client.db.fetchall(f"{sql} ORDER BY 4 {order}, 1 {order} LIMIT ?3", (*(before or after or (None, None)), self.chunk_size))
+        return rows[::-1] if before is not None else rows
+    async def count(self): return sum([await count_rows(self.client.db, "cases", schema) for schema in self.schemas()])
+    def key(self, row): return (row[3], row[0])
+    def encode_key(self, key): return f"{key[0]}|{key[1]}"
+    def decode_key(self, cursor: str): return tuple(cursor.split("|", 1))
     def create_embed(self):
-        start = self.current_page * self.chunk_size
-        end = start + self.chunk_size
-        chunk = self.cases[start:end]
-        embed = discord.Embed(title="Case Directory", color=discord.Color.blue())
+        embed = discord.Embed(title="Case Directory (including archive)" if self.filter == "archived" else "Case Directory", color=discord.Color.blue())
         embed.set_footer(text=f"Page {self.current_page + 1} of {self.max_pages}")
-        for case in chunk:
-            embed.add_field(name=f"ID: {case[0]}", value=f"Suspect: {case[2]}\nStatus: {case[5]}", inline=False)
+        for case in self.rows:
+            embed.add_field(name=f"ID: {case[0]}", value=f"Suspect: {case[1]}\nStatus: {case[2]}{' (Archived)' if case[4] else ''}", inline=False)
+        return embed
+
+class EvidencePaginator(KeysetPaginator):
+    kind = "evidence"
+    def __init__(self, client, filter="", chunk_size=5):
+        super().__init__(client, filter, chunk_size)
+        self.case_id = filter
+        self.case = None
+        self.jackets = []
+        self.archived = False
+    async def fetch(self, after=None, before=None):
+        dossier = await load_dossier(self.client.db, self.case_id, after, before, self.chunk_size)
+        if dossier is None: return []
+        self.case, self.jackets, evidence, self.total, self.archived = dossier
+        return evidence
+    async def count(self): return self.total
+    async def load(self, cursor=None, direction=None, page=0):
+        await super().load(cursor, direction, page)
+        return self.case is not None
+    def key(self, row): return row[0]
+    def decode_key(self, cursor: str): return int(cursor)
+    def create_embed(self):
+        color = discord.Color.red() if "DTF" in self.case_id else discord.Color.blue()
+        embed = discord.Embed(title=f"📂 Case: {self.case_id}", color=color)
+        embed.add_field(name="Status", value=f"{self.case[1]} (Archived)" if self.archived else self.case[1], inline=True)
+        embed.add_field(name="Suspect", value=self.case[0], inline=True)
+        if self.jackets: embed.add_field(name="Jackets", value="\n".join([f"🔗 [{j[0]}]({j[1]})" for j in self.jackets])[:1024], inline=False)
+        embed.add_field(name="Narrative", value=self.case[2][:1000], inline=False)
+        if self.rows:
+            embed.add_field(name=f"Evidence ({self.total})", value="\n".join([f"📎 {e[2]}: {e[1]}" for e in self.rows])[:1024], inline=False)
+            embed.set_footer(text=f"Evidence page {self.current_page + 1} of {self.max_pages}")
         return embed
-    @ui.button(label="Previous", style=discord.ButtonStyle.grey)
-    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
-        if self.current_page > 0:
-            self.current_page -= 1
-            await interaction.response.edit_message(embed=self.create_embed(), view=self)
-        else: await interaction.response.send_message("First page reached.", ephemeral=True)
-    @ui.button(label="Next", style=discord.ButtonStyle.grey)
-    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
-        if (self.current_page + 1) < self.max_pages:
-            self.current_page += 1
-            await interaction.response.edit_message(embed=self.create_embed(), view=self)
-        else: await interaction.response.send_message("Last page reached.", ephemeral=True)
+
+PAGINATORS = {paginator.kind: paginator for paginator in (LawPaginator, CasePaginator, EvidencePaginator)}
 
 class ResourcesSelect(ui.Select):
     def __init__(self):
@@ -95,6 +675,7 @@ class ResourcesSelect(ui.Select):
             discord.SelectOption(label="The Jacket", emoji="📁", description="Report Writing Checklist")
         ]
         super().__init__(placeholder="Select Field Guide Section...", min_values=1, max_values=1, options=options)
+    @instrumented
     async def callback(self, interaction: discord.Interaction):
         selection = self.values[0]
         embed = discord.Embed(color=discord.Color.gold())
@@ -137,11 +718,12 @@ class CaseModal(ui.Modal, title='New Investigation'):
     suspect = ui.TextInput(label='Suspect Name', placeholder='Forename Surname')
     charges = ui.TextInput(label='Potential Charges', style=discord.TextStyle.paragraph)
     narrative = ui.TextInput(label='Incident Narrative', style=discord.TextStyle.paragraph, min_length=20)
+    @instrumented
     async def on_submit(self, interaction: discord.Interaction):
-        case_id = await get_next_case_id(self.department)
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)", (case_id, interaction.user.display_name, self.suspect.value, self.charges.value, self.narrative.value, "OPEN", datetime.datetime.now().isoformat()))
-            await db.commit()
+        async with interaction.client.db.transaction() as db:
+            case_id = await get_next_case_id(db, self.department)
+            await db.execute(CASE_INSERT_SQL, (case_id, interaction.user.display_name, self.suspect.value, self.charges.value, self.narrative.value, "OPEN", datetime.datetime.now().isoformat()))
+        interaction.client.index.add_case(case_id, self.suspect.value)
         embed = discord.Embed(title=f"📂 Case Opened: {case_id}", color=discord.Color.green())
         embed.add_field(name="Suspect", value=self.suspect.value)
         await interaction.response.send_message(embed=embed)
@@ -154,148 +736,290 @@ class EditModal(ui.Modal):
         self.narrative_input = ui.TextInput(label='Narrative', style=discord.TextStyle.paragraph, default=current_narrative)
         self.add_item(self.suspect_input)
         self.add_item(self.narrative_input)
+    @instrumented
     async def on_submit(self, interaction: discord.Interaction):
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("UPDATE cases SET suspect = ?, narrative = ? WHERE case_id = ?", (self.suspect_input.value, self.narrative_input.value, self.case_id))
-            await db.commit()
+        await interaction.client.db.execute("UPDATE cases SET suspect = ?, narrative = ? WHERE case_id = ?", (self.suspect_input.value, self.narrative_input.value, self.case_id))
+        interaction.client.index.rename_case(self.case_id, self.suspect_input.value)
         await interaction.response.send_message(f"✅ Case {self.case_id} updated.", ephemeral=True)
 
 class CIDBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix="!", intents=discord.Intents.all())
+        self.db = Database(DB_NAME, archive_path=f"{os.path.splitext(DB_NAME)[0]}_archive.db")
+        self.index = RecordIndex()
+        self.metrics_runner = None
+        self.index_task = None
     async def setup_hook(self):
-        await init_db()
-        self.tree.copy_global_to(guild=discord.Object(id=GUILD_ID))
-        await self.tree.sync(guild=discord.Object(id=GUILD_ID))
+        await self.db.open()
+        await init_db(self.db)
+        await self.index.load_laws(self.db)
+        self.index_task = asyncio.create_task(self.load_case_index())
+        self.add_dynamic_items(PageButton)
+        if METRICS_PORT: await self.start_metrics_server()
+        if self.db.archive_path and ARCHIVE_AFTER_DAYS is not None: self.archive_task.start()
+        await self.sync_tree_if_changed(discord.Object(id=GUILD_ID))
+    async def sync_tree_if_changed(self, guild: discord.Object):
+        self.tree.copy_global_to(guild=guild)
+        payload = json.dumps([command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)], sort_keys=True)
+        digest = f"{self.application_id}:{guild.id}:{hashlib.sha256(payload.encode()).hexdigest()}"
+        stored = await self.db.fetchone("SELECT value FROM bot_meta WHERE key = 'tree_hash'")
+        if stored and stored[0] == digest: return log.info("Command tree unchanged, skipping sync")
+        await self.tree.sync(guild=guild)
+        await self.db.execute("INSERT INTO bot_meta VALUES ('tree_hash', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value", (digest,))
+    async def load_case_index(self):
+        for attempt in range(1, INDEX_LOAD_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try: await self.index.load_cases(self.db)
+            except Exception:
+                log.exception("Loading the open-case index failed (attempt %d of %d)", attempt, INDEX_LOAD_ATTEMPTS)
+                if attempt < INDEX_LOAD_ATTEMPTS: await asyncio.sleep(INDEX_RETRY_SECONDS)
+                continue
+            return log.info("Indexed %d open cases for autocomplete in %.2fs", len(self.index.open_cases), time.perf_counter() - started)
+        self.index.mark_cases_ready()
+        log.error("Case autocomplete is running without the startup index; only cases opened or edited since startup will be suggested")
+    @tasks.loop(hours=ARCHIVE_INTERVAL_HOURS)
+    async def archive_task(self):
+        try: moved = await archive_cases(self.db)
+        except aiosqlite.Error: return log.exception("Archive pass failed")
+        if moved: log.info("Moved %d closed/cold cases to the archive", moved)
+    async def start_metrics_server(self):
+        async def handle_metrics(request): return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self.metrics_runner = web.AppRunner(app, access_log=None)
+        await self.metrics_runner.setup()
+        try: await web.TCPSite(self.metrics_runner, METRICS_HOST, METRICS_PORT).start()
+        except OSError as e:
+            log.warning("Metrics endpoint disabled, could not listen on %s:%s: %s", METRICS_HOST, METRICS_PORT, e)
+            await self.metrics_runner.cleanup()
+            self.metrics_runner = None
+    async def close(self):
+        await super().close()
+        self.archive_task.cancel()
+        if self.index_task: self.index_task.cancel()
+        if self.metrics_runner: await self.metrics_runner.cleanup()
+        await self.db.close()
 
 client = CIDBot()
 
+@instrumented
+async def case_id_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=f"{case_id} - {suspect}"[:100], value=case_id) for case_id, suspect in client.index.complete_cases(current)]
+
+@instrumented
+async def law_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=f"{law[0]} - {law[1]}"[:100], value=law[0]) for law in client.index.complete_laws(current)]
+
 @client.tree.command(name="file_case", description="Open a new investigation file")
 @app_commands.choices(department=[app_commands.Choice(name="CID - Criminal Investigation", value="CID"), app_commands.Choice(name="DTF - Drug Task Force", value="DTF")])
+@instrumented
 async def file_case(interaction: discord.Interaction, department: app_commands.Choice[str]):
     if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
     await interaction.response.send_modal(CaseModal(department=department.value))
 
 @client.tree.command(name="edit_case", description="Update case status, suspect, or narrative")
 @app_commands.choices(new_status=[app_commands.Choice(name="Keep Current Status", value="KEEP"), app_commands.Choice(name="OPEN", value="OPEN"), app_commands.Choice(name="CLOSED", value="CLOSED"), app_commands.Choice(name="COLD", value="COLD")])
+@app_commands.autocomplete(case_id=case_id_autocomplete)
+@instrumented
 async def edit_case(interaction: discord.Interaction, case_id: str, new_status: app_commands.Choice[str]):
     if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT suspect, narrative FROM cases WHERE case_id = ?", (case_id,))
-        row = await cursor.fetchone()
-        if not row: return await interaction.response.send_message("❌ Not found.", ephemeral=True)
-        if new_status.value != "KEEP":
-            await db.execute("UPDATE cases SET status = ? WHERE case_id = ?", (new_status.value, case_id))
-            await db.commit()
+    row = await client.db.fetchone("SELECT suspect, narrative FROM cases WHERE case_id = ?", (case_id,))
+    if not row and await restore_case(client.db, case_id): row = await client.db.fetchone("SELECT suspect, narrative FROM cases WHERE case_id = ?", (case_id,))
+    if not row: return await interaction.response.send_message("❌ Not found.", ephemeral=True)
+    if new_status.value != "KEEP":
+        await client.db.execute("UPDATE cases SET status_changed = CASE WHEN status = ?1 THEN status_changed ELSE ?2 END, status = ?1 WHERE case_id = ?3", (new_status.value, datetime.datetime.now().isoformat(), case_id))
+        if new_status.value == "OPEN": client.index.add_case(case_id, row[0])
+        else: client.index.remove_case(case_id)
     await interaction.response.send_modal(EditModal(case_id, row[0], row[1]))
 
 @client.tree.command(name="field_guide", description="Access CID resources, SOPs, and Chain of Command")
+@instrumented
 async def field_guide(interaction: discord.Interaction):
     if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
     embed = discord.Embed(title="🛡️ CID / DTF Field Guide", description="Select a resource from the menu below.", color=discord.Color.gold())
     await interaction.response.send_message(embed=embed, view=ResourcesView())
 
 @client.tree.command(name="case_directory", description="View all current cases")
-async def case_directory(interaction: discord.Interaction):
+@instrumented
+async def case_directory(interaction: discord.Interaction, include_archived: bool = False):
     if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT case_id, detective, suspect, charges, narrative, status FROM cases ORDER BY timestamp DESC")
-        cases = await cursor.fetchall()
-    if not cases: return await interaction.response.send_message("Database empty.", ephemeral=True)
-    view = CasePaginator(cases)
-    await interaction.response.send_message(embed=view.create_embed(), view=view)
+    paginator = CasePaginator(client, "archived" if include_archived else "")
+    if not await paginator.load(): return await interaction.response.send_message("Database empty.", ephemeral=True)
+    await interaction.response.send_message(embed=paginator.create_embed(), view=paginator.view())
 
 @client.tree.command(name="case_lookup", description="View case dossier")
+@app_commands.autocomplete(case_id=case_id_autocomplete)
+@instrumented
 async def case_lookup(interaction: discord.Interaction, case_id: str):
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT * FROM cases WHERE case_id = ?", (case_id,))
-        case = await cursor.fetchone()
-        if not case: return await interaction.response.send_message("❌ Not found.", ephemeral=True)
-        cursor = await db.execute("SELECT label, url FROM case_jackets WHERE case_id = ?", (case_id,))
-        jackets = await cursor.fetchall()
-    color = discord.Color.red() if "DTF" in case[0] else discord.Color.blue()
-    embed = discord.Embed(title=f"📂 Case: {case[0]}", color=color)
-    embed.add_field(name="Status", value=case[5], inline=True)
-    embed.add_field(name="Suspect", value=case[2], inline=True)
-    if jackets: embed.add_field(name="Jackets", value="\n".join([f"🔗 [{j[0]}]({j[1]})" for j in jackets]), inline=False)
-    embed.add_field(name="Narrative", value=case[4][:1000], inline=False)
-    await interaction.response.send_message(embed=embed)
+    paginator = EvidencePaginator(client, case_id)
+    if not await paginator.load(): return await interaction.response.send_message("❌ Not found.", ephemeral=True)
+    if paginator.max_pages > 1: return await interaction.response.send_message(embed=paginator.create_embed(), view=paginator.view())
+    await interaction.response.send_message(embed=paginator.create_embed())
 
 @client.tree.command(name="add_jacket", description="Link document")
+@app_commands.autocomplete(case_id=case_id_autocomplete)
+@instrumented
 async def add_jacket(interaction: discord.Interaction, case_id: str, url: str, label: str):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("INSERT INTO case_jackets (case_id, url, label, added_by) VALUES (?, ?, ?, ?)", (case_id, url, label, interaction.user.display_name))
-        await db.commit()
+    params = (case_id, url, label, interaction.user.display_name)
+    added = await client.db.execute(JACKET_INSERT_SQL, params)
+    if not added and await restore_case(client.db, case_id): added = await client.db.execute(JACKET_INSERT_SQL, params)
+    if not added: return await interaction.response.send_message("❌ Not found.", ephemeral=True)
     await interaction.response.send_message(f"✅ Linked {label}.", ephemeral=True)
 
 @client.tree.command(name="add_evidence", description="Attach media link")
+@app_commands.autocomplete(case_id=case_id_autocomplete)
+@instrumented
 async def add_evidence(interaction: discord.Interaction, case_id: str, evidence_url: str):
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT narrative FROM cases WHERE case_id = ?", (case_id,))
-        row = await cursor.fetchone()
-        if not row: return await interaction.response.send_message("❌ Not found.", ephemeral=True)
-        new_nav = row[0] + f"\n\n**[EVIDENCE]** {interaction.user.display_name}: {evidence_url}"
-        await db.execute("UPDATE cases SET narrative = ? WHERE case_id = ?", (new_nav, case_id))
-        await db.commit()
+    params = (case_id, evidence_url, interaction.user.display_name, datetime.datetime.now().isoformat())
+    added = await client.db.execute(EVIDENCE_INSERT_SQL, params)
+    if not added and await restore_case(client.db, case_id): added = await client.db.execute(EVIDENCE_INSERT_SQL, params)
+    if not added: return await interaction.response.send_message("❌ Not found.", ephemeral=True)
     await interaction.response.send_message(f"✅ Evidence added.", ephemeral=True)
 
 @client.tree.command(name="import_case", description="Import legacy records")
+@instrumented
 async def import_case(interaction: discord.Interaction, case_id: str, suspect: str, status: str):
     if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)", (case_id, interaction.user.display_name, suspect, "LEGACY", "Imported record.", status.upper(), datetime.datetime.now().isoformat()))
-        await db.commit()
+    if await is_archived(client.db, case_id): return await interaction.response.send_message(f"❌ Case {case_id} already exists in the archive.", ephemeral=True)
+    async with client.db.transaction() as db:
+        await db.execute(CASE_INSERT_SQL, (case_id, interaction.user.display_name, suspect, "LEGACY", "Imported record.", status.upper(), datetime.datetime.now().isoformat()))
+        await bump_case_sequence(db, case_id)
+    if status.upper() == "OPEN": client.index.add_case(case_id, suspect)
     await interaction.response.send_message(f"✅ Case {case_id} imported.", ephemeral=True)
 
+@client.tree.command(name="import_cases", description="Bulk import legacy records from a CSV or JSONL file")
+@instrumented
+async def import_cases(interaction: discord.Interaction, file: discord.Attachment):
+    if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
+    if not file.filename.lower().endswith((".csv", ".jsonl", ".ndjson")): return await interaction.response.send_message("❌ Upload a .csv or .jsonl file.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    imported, rejected_count, batch, last_update = 0, 0, [], time.monotonic()
+    with tempfile.TemporaryFile() as upload, tempfile.TemporaryFile() as rejected_file:
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(file.url) as resp:
+                    resp.raise_for_status()
+                    async for chunk in resp.content.iter_chunked(65536): upload.write(chunk)
+        except aiohttp.ClientError: return await interaction.edit_original_response(content="❌ Could not download the attachment.")
+        upload.seek(0)
+        rejected_text = io.TextIOWrapper(rejected_file, encoding="utf-8", newline="", write_through=True)
+        rejected = csv.writer(rejected_text)
+        rejected.writerow(("line", "reason", "record"))
+        records = read_import_records(upload, file.filename)
+        try:
+            while True:
+                try:
+                    for line_no, record in records:
+                        try: row, jackets = validate_import_record(record, interaction.user.display_name)
+                        except ValueError as e:
+                            rejected.writerow((line_no, str(e), record if isinstance(record, str) else json.dumps(record)))
+                            rejected_count += 1
+                            continue
+                        batch.append((line_no, row, jackets))
+                        if len(batch) >= IMPORT_BATCH_SIZE: break
+                except (UnicodeDecodeError, csv.Error) as e:
+                    rejected.writerow(("", f"unreadable file: {e}", ""))
+                    rejected_count += 1
+                    records = iter(())
+                if not batch: break
+                rows = await import_batch(client.db, batch, rejected)
+                client.index.add_cases([(row[0], row[2]) for row in rows if row[5] == "OPEN"])
+                imported += len(rows)
+                rejected_count += len(batch) - len(rows)
+                batch = []
+                if time.monotonic() - last_update > 2:
+                    last_update = time.monotonic()
+                    await interaction.edit_original_response(content=f"⏳ Importing... {imported:,} cases imported, {rejected_count:,} rejected.")
+        except (aiosqlite.Error, discord.HTTPException) as e:
+            log.exception("Bulk import of %s failed after %d cases", file.filename, imported)
+            failure = f"❌ Import stopped: imported {imported:,} cases from {file.filename} before failure: {e}"
+            if not rejected_count: return await interaction.edit_original_response(content=failure)
+            rejected_file.seek(0)
+            return await interaction.edit_original_response(content=f"{failure}\n⚠️ {rejected_count:,} rows rejected so far, see attached report.", attachments=[discord.File(rejected_file, filename="rejected_rows.csv")])
+        summary = f"✅ Imported {imported:,} cases from {file.filename}."
+        if not rejected_count: return await interaction.edit_original_response(content=summary)
+        rejected_file.seek(0)
+        await interaction.edit_original_response(content=f"{summary}\n⚠️ {rejected_count:,} rows rejected, see attached report.", attachments=[discord.File(rejected_file, filename="rejected_rows.csv")])
+
 @client.tree.command(name="delete_case", description="Delete record")
+@app_commands.autocomplete(case_id=case_id_autocomplete)
+@instrumented
 async def delete_case(interaction: discord.Interaction, case_id: str):
     if interaction.user.id not in ADMIN_IDS: return await interaction.response.send_message("⛔ Denied.", ephemeral=True)
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("DELETE FROM cases WHERE case_id = ?", (case_id,))
-        await db.execute("DELETE FROM case_jackets WHERE case_id = ?", (case_id,))
-        await db.commit()
+    async with client.db.transaction() as db:
+        for schema in ("main", "archive") if client.db.archive_path else ("main",):
+            await db.execute(f"DELETE FROM {schema}.cases WHERE case_id = ?", (case_id,))
+            await db.execute(f"DELETE FROM {schema}.case_jackets WHERE case_id = ?", (case_id,))
+            await db.execute(f"DELETE FROM {schema}.case_evidence WHERE case_id = ?", (case_id,))
+    client.index.remove_case(case_id)
     await interaction.response.send_message(f"🗑️ Deleted {case_id}.", ephemeral=True)
 
 @client.tree.command(name="law_directory", description="View the Penal Code")
+@instrumented
 async def law_directory(interaction: discord.Interaction):
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT code_id, title, classification, description FROM penal_code ORDER BY code_id ASC")
-        laws = await cursor.fetchall()
-    if not laws: return await interaction.response.send_message("Penal Code is empty.", ephemeral=True)
-    view = LawPaginator(laws)
-    await interaction.response.send_message(embed=view.create_embed(), view=view)
+    paginator = LawPaginator(client)
+    if not await paginator.load(): return await interaction.response.send_message("Penal Code is empty.", ephemeral=True)
+    await interaction.response.send_message(embed=paginator.create_embed(), view=paginator.view())
 
 @client.tree.command(name="search_law", description="Search Penal Code by name or ID")
+@app_commands.autocomplete(query=law_autocomplete)
+@instrumented
 async def search_law(interaction: discord.Interaction, query: str):
-    async with aiosqlite.connect(DB_NAME) as db:
-        cursor = await db.execute("SELECT code_id, title, classification, description FROM penal_code WHERE title LIKE ? OR code_id LIKE ?", (f'%{query}%', f'%{query}%'))
-        laws = await cursor.fetchall()
+    if query.strip() in client.index.laws: total, laws = 1, [client.index.laws[query.strip()]]
+    else: total, laws = await search_penal_code(client.db, query)
     if not laws: return await interaction.response.send_message(f"❌ No laws found matching '{query}'", ephemeral=True)
-    if len(laws) == 1:
+    if total == 1:
         law = laws[0]
         embed = discord.Embed(title=f"⚖️ {law[0]} - {law[1]}", color=discord.Color.gold())
         embed.add_field(name="Class", value=law[2], inline=True)
         embed.add_field(name="Definition", value=law[3], inline=False)
         return await interaction.response.send_message(embed=embed)
-    view = LawPaginator(laws)
-    await interaction.response.send_message(f"🔍 Found {len(laws)} matches:", embed=view.create_embed(), view=view)
+    embed = discord.Embed(title=f"🔍 Penal Code Search: {query}"[:256], color=discord.Color.gold())
+    embed.set_footer(text=f"Showing top {len(laws)} of {total} matches")
+    for law in laws:
+        embed.add_field(name=f"{law[0]} - {law[1]}", value=f"**Class:** {law[2]}\n*{law[4]}*", inline=False)
+    await interaction.response.send_message(f"🔍 Found {total} matches:", embed=embed)
+
+@client.tree.command(name="search_cases", description="Search case files by suspect, charges, or narrative")
+@instrumented
+async def search_cases(interaction: discord.Interaction, query: str, include_archived: bool = False):
+    if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
+    total, cases = await search_case_files(client.db, query, include_archived=include_archived)
+    if not cases: return await interaction.response.send_message(f"❌ No cases found matching '{query}'", ephemeral=True)
+    embed = discord.Embed(title=f"🔍 Case Search: {query}"[:256], color=discord.Color.blue())
+    embed.set_footer(text=f"Showing top {len(cases)} of {total} matches")
+    for case in cases:
+        embed.add_field(name=f"ID: {case[0]}", value=f"Suspect: {case[1]}\nStatus: {case[2]}{' (Archived)' if case[4] else ''}\n{case[3][:300]}", inline=False)
+    await interaction.response.send_message(embed=embed)
 
 @client.tree.command(name="add_law", description="[ADMIN] Add a new law to database")
+@instrumented
 async def add_law(interaction: discord.Interaction, code: str, title: str, classification: str, description: str):
     if not any(role.id == CID_ROLE_ID for role in interaction.user.roles): return await interaction.response.send_message("⛔ Unauthorized.", ephemeral=True)
-    async with aiosqlite.connect(DB_NAME) as db:
-        try:
-            await db.execute("INSERT INTO penal_code VALUES (?, ?, ?, ?)", (code, title, classification, description))
-            await db.commit()
-            await interaction.response.send_message(f"✅ Added Law: **{code} - {title}**", ephemeral=True)
-        except aiosqlite.IntegrityError: await interaction.response.send_message(f"❌ Error: Law **{code}** already exists.", ephemeral=True)
+    try: await client.db.execute("INSERT INTO penal_code VALUES (?, ?, ?, ?)", (code, title, classification, description))
+    except aiosqlite.IntegrityError: return await interaction.response.send_message(f"❌ Error: Law **{code}** already exists.", ephemeral=True)
+    client.index.add_law((code, title, classification, description))
+    await interaction.response.send_message(f"✅ Added Law: **{code} - {title}**", ephemeral=True)
+
+@client.tree.command(name="cid_stats", description="[ADMIN] Command latency and database statistics")
+@instrumented
+async def cid_stats(interaction: discord.Interaction):
+    if interaction.user.id not in ADMIN_IDS: return await interaction.response.send_message("⛔ Denied.", ephemeral=True)
+    embed = discord.Embed(title="📊 CID RMS Statistics", description=f"Uptime: {datetime.timedelta(seconds=int(time.time() - metrics.started))}", color=discord.Color.dark_grey())
+    for name, hist in sorted(metrics.commands.items(), key=lambda item: item[1].count, reverse=True)[:20]:
+        queries, rows = metrics.counters[("cid_command_queries_total", name)], metrics.counters[("cid_command_rows_total", name)]
+        embed.add_field(name=name, value=f"Calls: {hist.count} | Errors: {metrics.counters[('cid_command_errors_total', name)]} | Late: {metrics.counters[('cid_deadline_misses_total', name)]}\np50 {hist.percentile(50) * 1000:.1f}ms · p95 {hist.percentile(95) * 1000:.1f}ms · p99 {hist.percentile(99) * 1000:.1f}ms\nQueries/call: {queries / hist.count:.1f} | Rows/call: {rows / hist.count:.1f}", inline=False)
+    sql = "\n".join(f"{kind}: {hist.count} (p95 {hist.percentile(95) * 1000:.1f}ms, slow {metrics.counters[('cid_slow_queries_total', kind)]})" for kind, hist in sorted(metrics.queries.items()))
+    embed.add_field(name="SQL", value=(sql or "No queries yet.")[:1024], inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @client.tree.command(name="cid_help", description="System manual")
+@instrumented
 async def cid_help(interaction: discord.Interaction):
     embed = discord.Embed(title="🛡️ CID/DTF System Manual", description="Authorized Personnel Only.", color=discord.Color.light_grey())
-    embed.add_field(name="📂 Case Management", value="`/file_case` - Start a new investigation.\n`/edit_case` - Update status, suspect, or narrative.\n`/case_directory` - Scroll through all active cases.\n`/case_lookup` - View full dossier, evidence, & jackets.", inline=False)
+    embed.add_field(name="📂 Case Management", value="`/file_case` - Start a new investigation.\n`/edit_case` - Update status, suspect, or narrative.\n`/case_directory` - Scroll through all active cases.\n`/case_lookup` - View full dossier, evidence, & jackets.\n`/search_cases` - Full-text search of suspects, charges & narratives.", inline=False)
     embed.add_field(name="⚖️ Evidence & Law", value="`/add_evidence` - Attach media (bodycam/photos).\n`/add_jacket` - Link documents (PDFs/Google Docs).\n`/law_directory` - Browse the Arkansas Penal Code.\n`/search_law` - Find statutes by name or ID.", inline=False)
-    embed.add_field(name="👮 Training & Admin", value="`/field_guide` - Access SOPs, Scripts & Chain of Command.\n`/import_case` - Manually import legacy records.\n`/delete_case` - [Overseer Only] Permanently wipe a file.\n`/add_law` - [Admin] Add new statutes to the database.", inline=False)
+    embed.add_field(name="👮 Training & Admin", value="`/field_guide` - Access SOPs, Scripts & Chain of Command.\n`/import_case` - Manually import legacy records.\n`/import_cases` - Bulk import legacy records from a CSV/JSONL file.\n`/delete_case` - [Overseer Only] Permanently wipe a file.\n`/add_law` - [Admin] Add new statutes to the database.\n`/cid_stats` - [Admin] Command latency & database statistics.", inline=False)
     await interaction.response.send_message(embed=embed)
 
-client.run(TOKEN)
+if __name__ == "__main__": client.run(TOKEN)